@@ -1,46 +1,116 @@
 import argparse
 import sys
+from collections import deque
 from pathlib import Path
 from executor import TestExecutor
 from generator import TestGenerator
+from project import ProjectModel
 from scanner import DependencyScanner
-from utils import parse_java_file, analyze_maven_log
+from utils import parse_java_file, analyze_maven_log, peak_rss_mb
 
-# --- Main CLI ---
-def main():
-    parser = argparse.ArgumentParser(description="AI Agent for generating Java Unit Tests")
-    parser.add_argument("file", help="Path to the Java source file")
-    parser.add_argument("--model", default="qwen2.5-coder", help="Ollama model to use")
-    parser.add_argument("--retries", type=int, default=3, help="Max retry attempts")
-
-    args = parser.parse_args()
 
-    target_file = Path(args.file)
-    if not target_file.exists():
-        print(f"❌ Error: File not found: {target_file}")
-        sys.exit(1)
+def positive_int(value):
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
 
-    print(f"📂 Analyzing: {target_file.name}...")
 
+def keep_alive_value(value):
+    """
+    Ollama only accepts unit-less keep-alive values as numbers (seconds);
+    strings must carry a unit ("30m"), so numeric input is converted.
+    """
     try:
-        # Using the imported function
-        package_name, class_name, source_code = parse_java_file(target_file)
-        print(f"   > Class: {class_name}")
-        print(f"   > Package: {package_name}")
-    except ValueError as e:
-        print(f"❌ Error parsing file: {e}")
-        sys.exit(1)
+        number = float(value)
+    except ValueError:
+        return value
+    return int(number) if number.is_integer() else number
 
-    # Initialize Components
-    executor = TestExecutor()
-    generator = TestGenerator(model=args.model)
-    scanner = DependencyScanner()
 
-    print("🔎 Scanning dependencies for context...")
-    dep_context = scanner.get_dependency_context(source_code, package_name)
+def check_flakiness(executor, test_class_name, module, runs, parallelism):
+    """
+    Re-runs a passing test class and describes any nondeterminism observed.
+    Returns "" when every re-run passed (or the re-runs couldn't execute).
+    """
+    results = executor.run_repeated(test_class_name, module, runs=runs, parallelism=parallelism)
+
+    failures = []
+    for seed, success, output in results:
+        with output:
+            analysis = analyze_maven_log(output, test_class_name)
+            if success and analysis["is_success"]:
+                continue
+            if not analysis["relevant_errors"]:
+                # The build failed without any test/compile error: a tooling problem
+                # (old Gradle without --rerun, unresolved plugin, ...), not flakiness
+                last_lines = deque(output, maxlen=5)
+                print(f"   > Re-run (seed {seed}) could not execute, not counted as flaky:\n      " + "\n      ".join(last_lines))
+                continue
+        failures.append(f"Re-run with method order seed {seed} FAILED:\n{analysis['relevant_errors']}")
+
+    if not failures:
+        return ""
+
+    header = (
+        f"The test PASSED once but FAILED in {len(failures)}/{runs} re-runs, each in a fresh JVM "
+        f"with a random test method order. The test is nondeterministic: look for dependence on "
+        f"method execution order, shared static/mutable state, timing, or the current date/time."
+    )
+    return header + "\n\n" + "\n\n".join(failures)
+
 
+def check_mutants(executor, package_name, class_name, module, threads):
+    """
+    Runs scoped mutation testing for the class under test.
+    Returns a prompt-ready list of surviving mutants ("" if none, None if PIT couldn't run).
+    """
+    target_class = f"{package_name}.{class_name}"
+    success, output, survivors = executor.run_mutation_test(
+        target_class, target_class + "Test", module, threads=threads
+    )
+    with output:
+        if survivors is None:
+            last_lines = deque(output, maxlen=5)
+            print("   > Mutation testing unavailable:\n      " + "\n      ".join(last_lines))
+            return None
+
+    return "\n".join(
+        f"- {m['method']}() line {m['line']}: {m['description']} [{m['mutator']}, {m['status']}]"
+        for m in survivors
+    )
+
+
+def split_shared_dependencies(dependency_blocks):
+    """
+    Splits per-class dependency blocks into (shared, per_class): dependencies used by
+    more than one class in the batch go into one shared block placed early in every
+    prompt, so the model server can reuse its cached prefix from class to class.
+    """
+    usage = {}
+    for blocks in dependency_blocks:
+        for dep_name, signatures in blocks.items():
+            usage.setdefault(dep_name, []).append(signatures)
+
+    # Keyed by simple name, so only share when every user sees the same signatures;
+    # same-named classes from different packages (com.a.Config / com.b.Config) stay per-class
+    shared = {
+        name: sigs[0] for name, sigs in sorted(usage.items())
+        if len(sigs) > 1 and len(set(sigs)) == 1
+    }
+    per_class = [{name: sig for name, sig in blocks.items() if name not in shared} for blocks in dependency_blocks]
+    return shared, per_class
+
+
+def run_agent(args, executor, generator, package_name, class_name, source_code, module, dep_context):
+    """
+    Generate -> run -> repair loop for one class. Returns True once a test is accepted.
+    """
     current_test_code = None
     error_log = None
+    surviving_mutants = None  # Set when the next attempt should strengthen a passing test
+    accepted_test_code = None  # Last test that passed every acceptance check
+    mutation_round = 0
 
     # --- Agent Loop ---
     for attempt in range(1, args.retries + 1):
@@ -48,6 +118,15 @@ def main():
 
         if attempt == 1:
             current_test_code = generator.generate_test(class_name, source_code, dep_context)
+        elif surviving_mutants:
+            current_test_code = generator.strengthen_test(
+                class_name,
+                source_code,
+                current_test_code,
+                surviving_mutants,
+                dep_context
+            )
+            surviving_mutants = None
         else:
             print("💡 Step 1: Analyzing previous failure...")
 
@@ -78,16 +157,42 @@ def main():
             break
 
         test_class_name = class_name + "Test"
-        executor.write_test_file(test_class_name, package_name, current_test_code)
+        executor.write_test_file(test_class_name, package_name, current_test_code, module)
 
-        print("⏳ Running Maven test...")
-        success, output = executor.run_maven_test(class_name + "Test")
+        print(f"⏳ Running {executor.project.build_tool.capitalize()} test...")
+        success, output = executor.run_test(test_class_name, module)
 
-        analysis = analyze_maven_log(output, test_class_name)
+        with output:
+            analysis = analyze_maven_log(output, test_class_name)
+            rss = peak_rss_mb()
+            print(f"   > Log: {output.size / (1024 * 1024):.1f} MB{' (spilled to disk)' if output.spilled else ''}"
+                  + (f", peak RSS {rss:.0f} MB" if rss is not None else ""))
 
         if analysis["is_success"]:
+            flaky_report = ""
+            if args.flaky_runs > 0:
+                print("🎲 Checking for flakiness...")
+                flaky_report = check_flakiness(executor, test_class_name, module, args.flaky_runs, args.flaky_parallel)
+            if flaky_report:
+                print(f"⚠️ Test is Flaky:")
+                print(flaky_report)
+
+                # Feed the observed nondeterminism back as the next repair
+                error_log = flaky_report
+                continue
+
+            if mutation_round < args.mutation_rounds:
+                mutation_round += 1
+                accepted_test_code = current_test_code
+                print(f"🧬 Mutation testing (round {mutation_round}/{args.mutation_rounds})...")
+                surviving_mutants = check_mutants(executor, package_name, class_name, module, args.mutation_threads)
+                if surviving_mutants:
+                    print(f"⚠️ Surviving Mutants:")
+                    print(surviving_mutants)
+                    continue
+
             print(f"\n🎉 SUCCESS! Test passed.")
-            return
+            return True
 
         if analysis["unrelated_errors"]:
             print("\n⛔ CRITICAL STOP: Unrelated Compilation Errors Detected!")
@@ -104,7 +209,88 @@ def main():
         # Pass ONLY the relevant errors to the LLM for the next attempt
         error_log = analysis["relevant_errors"]
 
+    if accepted_test_code:
+        # Strengthening didn't produce a better passing test; keep the last accepted one
+        executor.write_test_file(class_name + "Test", package_name, accepted_test_code, module)
+        print(f"\n🎉 SUCCESS! Test passed (restored last accepted version; some mutants may survive).")
+        return True
+
     print(f"\n❌ Failed after {args.retries} attempts.")
+    return False
+
+
+# --- Main CLI ---
+def main():
+    parser = argparse.ArgumentParser(description="AI Agent for generating Java Unit Tests")
+    parser.add_argument("files", nargs="+", help="Path(s) to the Java source file(s)")
+    parser.add_argument("--model", default="qwen2.5-coder", help="Ollama model to use")
+    parser.add_argument("--keep-alive", type=keep_alive_value, default="30m",
+                        help="How long Ollama keeps the model loaded between calls (e.g. 30m; plain numbers are seconds, -1 keeps it forever)")
+    parser.add_argument("--retries", type=int, default=3, help="Max retry attempts")
+    parser.add_argument("--project-root", default=".", help="Root of the Maven/Gradle project")
+    parser.add_argument("--log-memory-cap", type=positive_int, default=8,
+                        help="MB of build output kept in memory before spilling to a temp file")
+    parser.add_argument("--flaky-runs", type=int, default=3,
+                        help="Re-runs (random method order, fresh JVM) a passing test must survive (0 disables)")
+    parser.add_argument("--flaky-parallel", type=int, default=3,
+                        help="Max flakiness re-runs executed concurrently")
+    parser.add_argument("--mutation-rounds", type=int, default=0,
+                        help="Rounds of PIT mutation testing + test strengthening after success (0 disables)")
+    parser.add_argument("--mutation-threads", type=int, default=4, help="PIT worker threads")
+
+    args = parser.parse_args()
+
+    project = ProjectModel(args.project_root)
+    targets = []
+
+    for file_arg in args.files:
+        target_file = Path(file_arg)
+        if not target_file.exists():
+            print(f"❌ Error: File not found: {target_file}")
+            sys.exit(1)
+
+        print(f"📂 Analyzing: {target_file.name}...")
+
+        try:
+            # Using the imported function
+            package_name, class_name, source_code = parse_java_file(target_file)
+            print(f"   > Class: {class_name}")
+            print(f"   > Package: {package_name}")
+        except ValueError as e:
+            print(f"❌ Error parsing file: {e}")
+            sys.exit(1)
+
+        # Resolve which module owns the class so builds only touch that module
+        module = project.module_for(target_file)
+        print(f"   > Build: {project.build_tool} (module: {module or '<root>'})")
+
+        scanner = DependencyScanner(args.project_root, project=project, module=module)
+        print("🔎 Scanning dependencies for context...")
+        dep_blocks = scanner.get_dependency_blocks(source_code, package_name)
+        targets.append((package_name, class_name, source_code, module, dep_blocks))
+
+    # Initialize Components
+    executor = TestExecutor(args.project_root, project=project,
+                            log_memory_cap=args.log_memory_cap * 1024 * 1024)
+    shared, per_class = split_shared_dependencies([t[4] for t in targets])
+    generator = TestGenerator(
+        model=args.model,
+        keep_alive=args.keep_alive,
+        shared_context=DependencyScanner.format_dependency_blocks(shared)
+    )
+
+    passed = 0
+    for (package_name, class_name, source_code, module, _), dep_blocks in zip(targets, per_class):
+        if len(targets) > 1:
+            print(f"\n===== 📦 {package_name}.{class_name} =====")
+        dep_context = DependencyScanner.format_dependency_blocks(dep_blocks)
+        if run_agent(args, executor, generator, package_name, class_name, source_code, module, dep_context):
+            passed += 1
+
+    if len(targets) > 1:
+        print(f"\n📊 Batch: {passed}/{len(targets)} classes passed.")
+    print(f"📊 Prompt cache: {generator.prefix_stats.summary()}")
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
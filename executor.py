@@ -1,18 +1,91 @@
+import random
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from project import ProjectModel
+from utils import parse_pit_report
+
+
+class BuildLog:
+    """
+    Build output captured in a SpooledTemporaryFile: held in memory up to
+    `memory_cap` bytes, spilled to a temp file beyond that.
+    Iterating yields lines lazily, so the full log is never materialized as one string.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    MAX_LINE_BYTES = 16 * 1024  # Longer lines are truncated while reading
+
+    def __init__(self, memory_cap=8 * 1024 * 1024):
+        self._buffer = tempfile.SpooledTemporaryFile(max_size=memory_cap, mode="w+b")
+        if memory_cap <= 0:
+            # max_size=0 means "never spill"; a zero cap should mean "always on disk"
+            self._buffer.rollover()
+        self.size = 0
+
+    @classmethod
+    def from_text(cls, text):
+        log = cls()
+        log.write(text.encode("utf-8"))
+        return log
+
+    def write(self, data):
+        self._buffer.write(data)
+        self.size += len(data)
+
+    def capture(self, stream):
+        """ Copies a binary stream (e.g. a process pipe) into the log chunk by chunk """
+        while True:
+            chunk = stream.read(self.CHUNK_SIZE)
+            if not chunk:
+                break
+            self.write(chunk)
+
+    @property
+    def spilled(self):
+        return self._buffer._rolled
+
+    def __iter__(self):
+        self._buffer.seek(0)
+        while True:
+            raw = self._buffer.readline(self.MAX_LINE_BYTES)
+            if not raw:
+                break
+            if not raw.endswith(b"\n"):
+                # Skip the remainder of an overlong line
+                while True:
+                    rest = self._buffer.readline(self.MAX_LINE_BYTES)
+                    if not rest or rest.endswith(b"\n"):
+                        break
+            yield raw.decode("utf-8", errors="replace").rstrip("\r\n")
+
+    def __contains__(self, text):
+        return any(text in line for line in self)
+
+    def close(self):
+        self._buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
 
 class TestExecutor:
-    def __init__(self, project_root="."):
+    def __init__(self, project_root=".", project=None, log_memory_cap=8 * 1024 * 1024):
         self.project_root = Path(project_root).resolve()
+        self.project = project or ProjectModel(self.project_root)
+        self.log_memory_cap = log_memory_cap
 
-    def write_test_file(self, class_name, package_name, code_content):
+    def write_test_file(self, class_name, package_name, code_content, module=""):
         """
-        Writes the generated test code to src/test/java/...
+        Writes the generated test code to <module>/src/test/java/...
         """
         # Convert package (com.example) to path (com/example)
         package_path = package_name.replace(".", "/")
-        target_dir = self.project_root / "src/test/java" / package_path
+        target_dir = self.project.module_dir(module) / "src/test/java" / package_path
         target_dir.mkdir(parents=True, exist_ok=True)
 
         file_path = target_dir / f"{class_name}.java"
@@ -23,33 +96,78 @@ class TestExecutor:
 
         return file_path
 
-    def run_maven_test(self, test_class_name):
+    def run_test(self, test_class_name, module=""):
         """
-        Runs 'mvn test' specifically for the generated class.
-        Returns: (success: bool, output: str)
+        Runs the build tool's test task specifically for the generated class,
+        scoped to the module that owns it.
+        Returns: (success: bool, output: BuildLog)
         """
-        # Maven command to run a specific test class
-        # -Dtest=MyTestClass
-        cmd = ["mvn", "test", f"-Dtest={test_class_name}"]
+        # e.g. mvn test -Dtest=MyTestClass -pl core -am
+        #  or  ./gradlew :core:test --tests MyTestClass --daemon
+        cmd = self.project.test_command(test_class_name, module)
 
         print(f"🚀 Running command: {' '.join(cmd)}")
+        return self._run_command(cmd)
+
+    def run_repeated(self, test_class_name, module="", runs=3, parallelism=3):
+        """
+        Re-runs an already passing test class `runs` times, each in a fresh JVM with
+        a different random method order, up to `parallelism` runs at a time.
+        Returns: list of (seed, success, output) in run order
+        """
+        seeds = [random.randrange(1, 2 ** 31) for _ in range(runs)]
+        if not self.project.supports_parallel_reruns(module):
+            parallelism = 1
+
+        def rerun(seed):
+            cmd = self.project.rerun_command(test_class_name, module, seed)
+            success, output = self._run_command(cmd)
+            return seed, success, output
 
+        print(f"🔁 Re-running {test_class_name} {runs}x (parallelism: {parallelism})")
+        with ThreadPoolExecutor(max_workers=max(1, parallelism)) as pool:
+            return list(pool.map(rerun, seeds))
+
+    def run_mutation_test(self, target_class, target_test, module="", threads=4):
+        """
+        Runs PIT against a single class using only its generated test.
+        Returns: (success: bool, output: BuildLog, survivors: list | None)
+        """
+        cmd = self.project.mutation_command(target_class, target_test, module, threads)
+        if cmd is None:
+            return False, BuildLog.from_text(
+                f"Mutation testing is not supported for {self.project.build_tool} projects."
+            ), None
+
+        report_path = self.project.mutation_report(module)
+        report_path.unlink(missing_ok=True)
+
+        print(f"🧬 Running command: {' '.join(cmd)}")
+        success, output = self._run_command(cmd)
+        survivors = parse_pit_report(report_path) if success else None
+        return success, output, survivors
+
+    def _run_command(self, cmd):
         try:
-            # Capture both stdout and stderr
-            result = subprocess.run(
+            # Stream stdout and stderr (merged) into a bounded buffer instead of
+            # holding the whole output in memory
+            output = BuildLog(memory_cap=self.log_memory_cap)
+            with subprocess.Popen(
                 cmd,
                 cwd=self.project_root,
-                capture_output=True,
-                text=True,
-                check=False  # Don't throw exception on failure, we want to read the logs
-            )
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            ) as process:
+                output.capture(process.stdout)
+                returncode = process.wait()
 
-            success = result.returncode == 0
-            output = result.stdout + "\n" + result.stderr
+            success = returncode == 0
             return success, output
 
         except FileNotFoundError:
-            return False, "❌ Error: 'mvn' command not found. Is Maven installed and in your PATH?"
+            return False, BuildLog.from_text(
+                f"❌ Error: '{cmd[0]}' command not found. Is {self.project.build_tool.capitalize()} installed and in your PATH?"
+            )
 
 
 # --- Smoke Test (Run this file directly to test the harness) ---
@@ -79,10 +197,10 @@ if __name__ == "__main__":
 
     # 4. Run it
     print("\n--- 2. Testing Execution ---")
-    success, log = executor.run_maven_test("AgentSmokeTest")
+    success, log = executor.run_test("AgentSmokeTest")
 
     print(f"\nResult: {'✅ SUCCESS' if success else '❌ FAILURE'}")
     if "--- AGENT SMOKE TEST RUNNING ---" in log:
-        print("Confirmed: Maven actually ran our code.")
+        print("Confirmed: the build actually ran our code.")
     else:
         print("Warning: Did not see expected output in logs.")
@@ -1,121 +1,153 @@
 import ollama
+import os
 import re
 
 
-class TestGenerator:
-    def __init__(self, model="qwen2.5-coder"):
-        self.model = model
+class PrefixCacheStats:
+    """
+    Tracks how much of each prompt repeats the previous one byte-for-byte.
+    Ollama keeps the KV cache of the last prompt, so that shared prefix is not prefilled again.
+    """
+
+    CHARS_PER_TOKEN = 4  # Rough estimate for code-heavy prompts
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_chars = 0
+        self.reused_chars = 0
+        self.prompt_eval_tokens = 0  # Tokens Ollama reports as evaluated
+        self.prompt_eval_seconds = 0.0
+        self._last_prompt = ""
+
+    def record(self, prompt_text, response):
+        shared = len(os.path.commonprefix([self._last_prompt, prompt_text]))
+        self._last_prompt = prompt_text
+
+        self.calls += 1
+        self.prompt_chars += len(prompt_text)
+        self.reused_chars += shared
+        self.prompt_eval_tokens += response.get('prompt_eval_count') or 0
+        self.prompt_eval_seconds += (response.get('prompt_eval_duration') or 0) / 1e9
+        return shared // self.CHARS_PER_TOKEN
+
+    def summary(self):
+        if not self.calls:
+            return "No LLM calls made."
+        saved_tokens = self.reused_chars // self.CHARS_PER_TOKEN
+        return (
+            f"{self.calls} calls, ~{saved_tokens} prefill tokens reused from cache "
+            f"(~{saved_tokens // self.calls}/call, {100 * self.reused_chars / self.prompt_chars:.0f}% of prompt text); "
+            f"Ollama evaluated {self.prompt_eval_tokens} prompt tokens in {self.prompt_eval_seconds:.1f}s"
+        )
 
-        # 1. Generator Persona
-        self.system_prompt_generate = """
-        You are an expert Java QA Automation Engineer.
-        Your goal is to write robust JUnit 5 tests.
-        OUTPUT ONLY JAVA CODE. No conversational text.
-        """
 
-        # 2. Analyst Persona (Pure Text)
-        self.system_prompt_analyze = """
-        You are a Senior Java Developer reviewing a failed test.
-        Your goal is to diagnose the root cause of the failure based on the logs.
-        Be concise and technical. Do not write code yet.
-        """
+class TestGenerator:
+    # One byte-identical system prompt for every call: the per-call role lives in the
+    # TASK section at the end of the user message, so the cached prefix survives
+    # switching between generating, analyzing and fixing.
+    SYSTEM_PROMPT = (
+        "You are an expert Java QA Automation Engineer who writes, diagnoses and repairs JUnit 5 tests.\n"
+        "Project conventions:\n"
+        "1. Use JUnit 5 and Mockito.\n"
+        "2. The test's package name must match the source.\n"
+        "3. The test class is named <ClassName>Test.\n"
+        "Each message ends with a TASK section. Follow it exactly: when it asks for code, "
+        "output ONLY the Java code block with no conversational text; when it asks for analysis, "
+        "be concise and technical and do not write code."
+    )
+
+    def __init__(self, model="qwen2.5-coder", keep_alive="30m", shared_context=""):
+        self.model = model
+        # How long Ollama keeps the model (and its KV cache) loaded between calls
+        self.keep_alive = keep_alive
+        # Dependency signatures common to every class in the batch; goes right after the system prompt
+        self.shared_context = shared_context
+        self.prefix_stats = PrefixCacheStats()
 
     def generate_test(self, class_name, source_code, dependency_context=""):
-        user_prompt = f"""
-        Write a unit test class for: {class_name}
-
-        SOURCE CODE:
-        ```java
-        {source_code}
-        ```
-
-        CONTEXT (Dependencies):
-        ```text
-        {dependency_context}
-        ```
-
-        Remember:
-        1. Use JUnit 5 and Mockito.
-        2. Package name must match the source.
-        3. Output ONLY the Java code block.
-        """
+        task = (
+            f"Write a unit test class for: {class_name}\n"
+            "Output ONLY the Java code block."
+        )
+        user_prompt = self._build_prompt(class_name, source_code, dependency_context, [], task)
         print(f"🧠 Generating initial test... (Model: {self.model})")
-        return self._call_ollama(self.system_prompt_generate, user_prompt, extract_code=True)
+        return self._call_ollama(user_prompt, extract_code=True)
 
     # --- STEP 1: REASONING ---
     def analyze_error(self, class_name, source_code, current_test_code, error_log, dependency_context):
-        user_prompt = f"""
-        The test for {class_name} failed. Analyze the error log and explain the fix.
-
-        SOURCE CODE:
-        ```java
-        {source_code}
-        ```
-
-        FAILED TEST CODE:
-        ```java
-        {current_test_code}
-        ```
-
-        ERROR LOG:
-        ```text
-        {error_log}
-        ```
-
-        CONTEXT (Dependencies):
-        ```text
-        {dependency_context}
-        ```
-
-        INSTRUCTIONS:
-        1. Identify the specific compilation error or assertion failure.
-        2. Explain specifically what needs to change in the test code (e.g., "Add import for X", "Change mock return type to Y").
-        3. Do NOT output the full code yet. Just the analysis.
-        """
+        task = (
+            f"The test for {class_name} failed. Analyze the error log and explain the fix.\n"
+            "1. Identify the specific compilation error or assertion failure.\n"
+            "2. Explain specifically what needs to change in the test code "
+            "(e.g., \"Add import for X\", \"Change mock return type to Y\").\n"
+            "3. Do NOT output the full code yet. Just the analysis."
+        )
+        user_prompt = self._build_prompt(class_name, source_code, dependency_context, [
+            ("FAILED TEST CODE", "java", current_test_code),
+            ("ERROR LOG", "text", error_log),
+        ], task)
         print(f"🕵️ Analyzing failure... (Model: {self.model})")
         # We want raw text here, not code extraction
-        return self._call_ollama(self.system_prompt_analyze, user_prompt, extract_code=False)
+        return self._call_ollama(user_prompt, extract_code=False)
 
     # --- STEP 2: CODING ---
     def apply_fix(self, class_name, source_code, current_test_code, error_log, analysis, dependency_context):
-        user_prompt = f"""
-        Fix the failed Java test based on your analysis.
-
-        YOUR ANALYSIS:
-        "{analysis}"
-
-        ERROR LOG:
-        ```text
-        {error_log}
-        ```
-
-        FAILED TEST CODE:
-        ```java
-        {current_test_code}
-        ```
-
-        SOURCE CODE:
-        ```java
-        {source_code}
-        ```
-
-        CONTEXT (Dependencies):
-        ```text
-        {dependency_context}
-        ```
-
-        Output the FULL corrected {class_name}Test.java class.
-        """
+        task = (
+            "Fix the failed Java test based on YOUR ANALYSIS.\n"
+            f"Output the FULL corrected {class_name}Test.java class."
+        )
+        # Same leading sections as analyze_error, so that call's cache is reused
+        user_prompt = self._build_prompt(class_name, source_code, dependency_context, [
+            ("FAILED TEST CODE", "java", current_test_code),
+            ("ERROR LOG", "text", error_log),
+            ("YOUR ANALYSIS", "text", analysis),
+        ], task)
         print(f"🔧 Applying fix... (Model: {self.model})")
-        return self._call_ollama(self.system_prompt_generate, user_prompt, extract_code=True)
+        return self._call_ollama(user_prompt, extract_code=True)
+
+    # --- QUALITY GATE: KILL SURVIVING MUTANTS ---
+    def strengthen_test(self, class_name, source_code, current_test_code, surviving_mutants, dependency_context):
+        task = (
+            f"The test for {class_name} passes, but mutation testing shows it does not detect "
+            "the SURVIVING MUTANTS (changes to the source code).\n"
+            "1. Keep every existing test passing.\n"
+            "2. Add or tighten assertions (return values, thrown exceptions, boundary inputs, mock verifications) "
+            "so each listed mutant would make a test fail.\n"
+            f"3. Output the FULL improved {class_name}Test.java class."
+        )
+        user_prompt = self._build_prompt(class_name, source_code, dependency_context, [
+            ("PASSING TEST CODE", "java", current_test_code),
+            ("SURVIVING MUTANTS", "text", surviving_mutants),
+        ], task)
+        print(f"💪 Strengthening test against surviving mutants... (Model: {self.model})")
+        return self._call_ollama(user_prompt, extract_code=True)
+
+    def _build_prompt(self, class_name, source_code, dependency_context, attempt_sections, task):
+        """
+        Lays out the user message from most to least stable:
+        shared batch context, per-class material, per-attempt material, then the task.
+        """
+        sections = [
+            ("SHARED CONTEXT (Dependencies common to this project)", "text", self.shared_context),
+            (f"SOURCE CODE ({class_name})", "java", source_code),
+            ("CONTEXT (Dependencies)", "text", dependency_context),
+        ] + attempt_sections
 
-    def _call_ollama(self, system_prompt, user_prompt, extract_code=True):
+        parts = [f"{title}:\n```{lang}\n{(body or '').strip()}\n```" for title, lang, body in sections]
+        parts.append(f"TASK:\n{task}")
+        return "\n\n".join(parts) + "\n"
+
+    def _call_ollama(self, user_prompt, extract_code=True):
         try:
-            response = ollama.chat(model=self.model, messages=[
-                {'role': 'system', 'content': system_prompt},
+            response = ollama.chat(model=self.model, keep_alive=self.keep_alive, messages=[
+                {'role': 'system', 'content': self.SYSTEM_PROMPT},
                 {'role': 'user', 'content': user_prompt},
             ])
 
+            reused = self.prefix_stats.record(self.SYSTEM_PROMPT + "\n" + user_prompt, response)
+            print(f"   > Prompt cache: ~{reused} prefix tokens reused, "
+                  f"{response.get('prompt_eval_count') or 0} evaluated")
+
             content = response['message']['content']
             if extract_code:
                 return self._extract_code(content)
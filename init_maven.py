@@ -22,6 +22,8 @@ POM_TEMPLATE = textwrap.dedent(
             <junit.jupiter.version>5.10.2</junit.jupiter.version>
             <mockito.version>5.11.0</mockito.version>
             <maven-surefire-plugin.version>3.2.5</maven-surefire-plugin.version>
+            <pitest.version>1.15.8</pitest.version>
+            <pitest-junit5-plugin.version>1.2.1</pitest-junit5-plugin.version>
         </properties>
 
         <dependencies>
@@ -61,6 +63,20 @@ POM_TEMPLATE = textwrap.dedent(
                         <useModulePath>false</useModulePath>
                     </configuration>
                 </plugin>
+                <!-- PIT mutation testing; invoked on demand by the agent's quality gate
+                     (not bound to a phase). The JUnit 5 plugin lets PIT run Jupiter tests -->
+                <plugin>
+                    <groupId>org.pitest</groupId>
+                    <artifactId>pitest-maven</artifactId>
+                    <version>${pitest.version}</version>
+                    <dependencies>
+                        <dependency>
+                            <groupId>org.pitest</groupId>
+                            <artifactId>pitest-junit5-plugin</artifactId>
+                            <version>${pitest-junit5-plugin.version}</version>
+                        </dependency>
+                    </dependencies>
+                </plugin>
             </plugins>
         </build>
     </project>
@@ -87,7 +103,7 @@ def write_pom(project_root: Path, force: bool = False) -> None:
 
 def main():
     parser = argparse.ArgumentParser(
-        description="Create a baseline pom.xml with JUnit 5 and Mockito."
+        description="Create a baseline pom.xml with JUnit 5, Mockito and PIT."
     )
     parser.add_argument(
         "--project-root",
@@ -0,0 +1,224 @@
+import re
+import textwrap
+from pathlib import Path
+
+
+# Applies the same seeded random method order to Gradle Test tasks that the Maven
+# reruns get via -D properties (Gradle doesn't forward -D to test JVMs)
+RANDOM_ORDER_INIT_SCRIPT = textwrap.dedent(
+    """\
+    allprojects {
+        tasks.withType(Test).configureEach {
+            def seed = project.findProperty('jtesterai.seed')
+            if (seed != null) {
+                systemProperty 'junit.jupiter.testmethod.order.default', 'org.junit.jupiter.api.MethodOrderer$Random'
+                systemProperty 'junit.jupiter.execution.order.random.seed', seed
+            }
+        }
+    }
+    """
+)
+
+
+class ProjectModel:
+    """
+    Discovers the build layout (Maven or Gradle, single or multi-module)
+    so the other components can locate sources and target a single module.
+    """
+
+    SOURCE_DIRS = ("src/main/java", "src/test/java")
+    MUTATION_TIMEOUT_MS = 2000  # Added to PIT's per-test timeout so infinite-loop mutants die fast
+
+    def __init__(self, project_root="."):
+        self.project_root = Path(project_root).resolve()
+        self.build_tool = self._detect_build_tool()
+
+        # Module paths relative to the project root ("" is the root project)
+        if self.build_tool == "gradle":
+            self.modules = self._discover_gradle_modules()
+        else:
+            self.modules = self._discover_maven_modules(Path(""))
+
+    def _detect_build_tool(self):
+        if (self.project_root / "pom.xml").exists():
+            return "maven"
+        for name in ("settings.gradle", "settings.gradle.kts", "build.gradle", "build.gradle.kts"):
+            if (self.project_root / name).exists():
+                return "gradle"
+        return "maven"
+
+    def _discover_maven_modules(self, module_dir):
+        """ Walks <modules> recursively, returning every reactor module directory """
+        modules = [module_dir.as_posix() if module_dir.parts else ""]
+        pom_path = self.project_root / module_dir / "pom.xml"
+        if not pom_path.exists():
+            return modules
+
+        content = pom_path.read_text(encoding="utf-8", errors="replace")
+        content = re.sub(r"<!--.*?-->", "", content, flags=re.DOTALL)
+        for child in re.findall(r"<module>\s*([^<]+?)\s*</module>", content):
+            child_dir = Path(module_dir, child)
+            if (self.project_root / child_dir).is_dir():
+                modules.extend(self._discover_maven_modules(child_dir))
+        return modules
+
+    def _discover_gradle_modules(self):
+        """ Reads include(...) entries from settings.gradle(.kts), including multi-line lists """
+        modules = [""]
+        for name in ("settings.gradle", "settings.gradle.kts"):
+            settings_path = self.project_root / name
+            if not settings_path.exists():
+                continue
+
+            content = settings_path.read_text(encoding="utf-8", errors="replace")
+            content = re.sub(r"/\*.*?\*/|//[^\n]*", "", content, flags=re.DOTALL)
+            # include ':a', ':b'  /  include(":a",\n ":b")  /  include ':a',\n        ':b'
+            include_pattern = r"\binclude\b\s*\(?((?:\s*['\"][^'\"]+['\"]\s*,?)+)"
+            for project_list in re.findall(include_pattern, content):
+                for project_path in re.findall(r"['\"]:?([\w\-.:]+)['\"]", project_list):
+                    # include ':app:web' also makes ':app' a project
+                    parts = project_path.split(":")
+                    for depth in range(1, len(parts) + 1):
+                        module = "/".join(parts[:depth])
+                        if module not in modules:
+                            modules.append(module)
+        return modules
+
+    def module_dir(self, module):
+        return self.project_root / module if module else self.project_root
+
+    def module_for(self, file_path):
+        """
+        Returns the module owning the given file (deepest matching module directory).
+        """
+        file_path = Path(file_path).resolve()
+        best = ""
+        for module in self.modules:
+            if not module:
+                continue
+            try:
+                file_path.relative_to(self.module_dir(module))
+            except ValueError:
+                continue
+            if len(module) > len(best):
+                best = module
+        return best
+
+    def source_roots(self, preferred_module=None):
+        """
+        Returns every existing Java source root across all modules.
+        Roots of `preferred_module` come first so local types win over siblings.
+        """
+        ordered = list(self.modules)
+        if preferred_module in ordered:
+            ordered.remove(preferred_module)
+            ordered.insert(0, preferred_module)
+
+        roots = []
+        for module in ordered:
+            for subdir in self.SOURCE_DIRS:
+                root = self.module_dir(module) / subdir
+                if root.is_dir():
+                    roots.append(root)
+        return roots
+
+    def test_command(self, test_class_name, module=""):
+        """
+        Builds the command that compiles and tests only `module` (plus what it depends on).
+        """
+        if self.build_tool == "gradle":
+            return [self._gradle_executable(), self._gradle_task(module), "--tests", test_class_name, "--daemon"]
+
+        cmd = ["mvn", "test", f"-Dtest={test_class_name}"]
+        if module:
+            # -am also builds upstream modules, which don't contain the test class
+            cmd += ["-pl", module, "-am", "-Dsurefire.failIfNoSpecifiedTests=false"]
+        return cmd
+
+    def rerun_command(self, test_class_name, module="", seed=0):
+        """
+        Builds the command that re-executes an already-compiled test class in a
+        fresh JVM with a seeded random method order (used for flakiness checks).
+        """
+        if self.build_tool == "gradle":
+            # --rerun ignores up-to-date checks; the init script applies the seeded order
+            return [self._gradle_executable(), self._gradle_task(module), "--tests", test_class_name,
+                    "--rerun", "--daemon", "--init-script", str(self._random_order_init_script()),
+                    f"-Pjtesterai.seed={seed}"]
+
+        order_props = [
+            "-Djunit.jupiter.testmethod.order.default=org.junit.jupiter.api.MethodOrderer$Random",
+            f"-Djunit.jupiter.execution.order.random.seed={seed}",
+            "-DforkCount=1",
+            "-DreuseForks=false",
+        ]
+        if module:
+            # Upstream reactor modules are only resolved when the lifecycle runs
+            return ["mvn", "test", f"-Dtest={test_class_name}", "-pl", module, "-am",
+                    "-Dsurefire.failIfNoSpecifiedTests=false"] + order_props
+
+        # Single module: skip the lifecycle and reuse the classes from the green run
+        return ["mvn", "surefire:test", f"-Dtest={test_class_name}"] + order_props
+
+    def mutation_command(self, target_class, target_test, module="", threads=4):
+        """
+        Builds a PIT run scoped to one production class and its test (fully qualified names).
+        Returns None when the build tool isn't supported.
+        """
+        if self.build_tool == "gradle":
+            # gradle-pitest-plugin needs build script configuration we can't inject per run
+            return None
+
+        cmd = [
+            "mvn", "test-compile", "org.pitest:pitest-maven:mutationCoverage",
+            f"-DtargetClasses={target_class}",
+            f"-DtargetTests={target_test}",
+            f"-Dthreads={threads}",
+            f"-DtimeoutConstant={self.MUTATION_TIMEOUT_MS}",
+            "-DoutputFormats=XML",
+            "-DtimestampedReports=false",
+            # Incremental analysis: unchanged mutants are not re-run. PIT keys this history
+            # file by each module's coordinates, so -am upstream modules can't clobber it
+            "-DwithHistory=true",
+        ]
+        if module:
+            # Upstream modules have no matching classes; don't fail on them
+            cmd += ["-pl", module, "-am", "-DfailWhenNoMutations=false"]
+        return cmd
+
+    def mutation_report(self, module=""):
+        return self.module_dir(module) / "target/pit-reports/mutations.xml"
+
+    def supports_parallel_reruns(self, module=""):
+        """
+        Only goal-only Maven reruns can safely overlap: they don't recompile, though they
+        do overwrite each other's target/surefire-reports files (the agent reads console
+        output only). Lifecycle builds and Gradle invocations on the same project would
+        race or serialize on its locks.
+        """
+        return self.build_tool == "maven" and not module
+
+    def _gradle_executable(self):
+        wrapper = self.project_root / "gradlew"
+        return str(wrapper) if wrapper.exists() else "gradle"
+
+    def _random_order_init_script(self):
+        # .gradle/ is Gradle's own per-project cache directory, normally git-ignored
+        script_path = self.project_root / ".gradle" / "jtesterai-random-order.init.gradle"
+        if not script_path.exists() or script_path.read_text(encoding="utf-8") != RANDOM_ORDER_INIT_SCRIPT:
+            script_path.parent.mkdir(parents=True, exist_ok=True)
+            script_path.write_text(RANDOM_ORDER_INIT_SCRIPT, encoding="utf-8")
+        return script_path
+
+    def _gradle_task(self, module):
+        # A bare "test" would run in every subproject and fail where --tests matches nothing
+        return f":{module.replace('/', ':')}:test" if module else ":test"
+
+
+# --- Smoke Test ---
+if __name__ == "__main__":
+    project = ProjectModel()
+    print(f"Build tool: {project.build_tool}")
+    print(f"Modules: {project.modules}")
+    print(f"Source roots: {[str(r) for r in project.source_roots()]}")
+    print(f"Command: {' '.join(project.test_command('AgentSmokeTest', project.modules[-1]))}")
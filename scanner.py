@@ -1,11 +1,15 @@
 import os
 import re
 from pathlib import Path
+from project import ProjectModel
 
 
 class DependencyScanner:
-    def __init__(self, project_root="."):
+    def __init__(self, project_root=".", project=None, module=""):
         self.project_root = Path(project_root).resolve()
+        self.project = project or ProjectModel(self.project_root)
+        # Module of the class under test; its source roots are searched first
+        self.module = module
         # Common Java/SDK types to ignore to save time/context
         self.ignored_types = {
             "String", "Integer", "Long", "Double", "Boolean", "List", "Map", "Set",
@@ -16,8 +20,14 @@ class DependencyScanner:
         """
         Analyzes source code for BOTH explicit imports and same-package implicit deps.
         """
-        context_str = ""
-        found_files = set()  # Track what we've already scanned to avoid duplicates
+        return self.format_dependency_blocks(self.get_dependency_blocks(source_code, current_package_name))
+
+    def get_dependency_blocks(self, source_code, current_package_name):
+        """
+        Same scan as get_dependency_context, but returns {ClassName: signatures}
+        sorted by class name, so callers can split shared and per-class context.
+        """
+        blocks = {}  # Also tracks what we've already scanned to avoid duplicates
 
         # 1. Explicit Imports
         imports = self._extract_imports(source_code)
@@ -36,17 +46,23 @@ class DependencyScanner:
                 continue
 
             # Skip if we already processed this class
-            if class_name in found_files:
+            if class_name in blocks:
                 continue
 
             file_path = self._find_file(class_name, package_name)
 
             if file_path and file_path.exists():
                 print(f"   > Found dependency: {class_name} ({file_path.name})")
-                signatures = self._extract_public_signatures(file_path)
-                context_str += f"\n--- Dependency: {class_name} ---\n{signatures}\n"
-                found_files.add(class_name)
+                blocks[class_name] = self._extract_public_signatures(file_path)
+
+        # Stable order keeps the prompt text byte-identical between runs
+        return dict(sorted(blocks.items()))
 
+    @staticmethod
+    def format_dependency_blocks(blocks):
+        context_str = ""
+        for class_name, signatures in blocks.items():
+            context_str += f"\n--- Dependency: {class_name} ---\n{signatures}\n"
         return context_str
 
     def _extract_imports(self, source_code):
@@ -71,7 +87,7 @@ class DependencyScanner:
         potential_matches = re.findall(pattern, source_code)
 
         candidates = []
-        for class_name in set(potential_matches):
+        for class_name in sorted(set(potential_matches)):
             if class_name not in self.ignored_types:
                 # Assume it belongs to the current package
                 candidates.append((class_name, current_package))
@@ -80,10 +96,8 @@ class DependencyScanner:
 
     def _find_file(self, class_name, package_name):
         path_suffix = package_name.replace(".", "/")
-        possible_roots = [
-            self.project_root / "src/main/java",
-            self.project_root / "src/test/java"
-        ]
+        # Sibling modules' source roots too, so cross-module types resolve
+        possible_roots = self.project.source_roots(preferred_module=self.module)
 
         for root in possible_roots:
             full_path = root / path_suffix / f"{class_name}.java"
@@ -1,4 +1,6 @@
 import re
+import sys
+import xml.etree.ElementTree as ET
 
 
 def parse_java_file(file_path):
@@ -18,16 +20,41 @@ def parse_java_file(file_path):
     return package_name, class_name, content
 
 
+class _LineReader:
+    """
+    Lazy line iterator with one line of push-back, so the analyzer can look ahead
+    without loading the whole log. Also notes whether 'BUILD SUCCESS' went past.
+    """
+
+    def __init__(self, log_output):
+        # Accept a plain string as well as any iterable of lines (e.g. BuildLog)
+        source = log_output.splitlines() if isinstance(log_output, str) else log_output
+        self._lines = iter(source)
+        self._pushed = []
+        self.saw_success = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._pushed:
+            return self._pushed.pop()
+        line = next(self._lines)
+        if "BUILD SUCCESS" in line:
+            self.saw_success = True
+        return line
+
+    def push_back(self, line):
+        self._pushed.append(line)
+
+
 def analyze_maven_log(log_output, target_test_class):
-    lines = log_output.splitlines()
+    lines = _LineReader(log_output)
     relevant_errors = []
     seen_errors = set()
     unrelated_errors = set()
 
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-
+    for line in lines:
         # --- 1. Catch Compilation Errors ---
         if "[ERROR]" in line and ".java:[" in line:
             match = re.search(r"[/\\]?(\w+\.java):\[(\d+),\d+\]\s+(.*)", line)
@@ -40,19 +67,17 @@ def analyze_maven_log(log_output, target_test_class):
                     full_error = f"Line {line_num}: {main_msg}"
 
                     # Look Ahead for details
-                    j = i + 1
                     details = []
-                    while j < len(lines):
-                        next_line = lines[j]
+                    for next_line in lines:
                         # Stop if we hit a new error block or info block
                         if ".java:[" in next_line or "[INFO]" in next_line:
+                            lines.push_back(next_line)
                             break
 
                         if "[ERROR]" in next_line:
                             clean_detail = next_line.replace("[ERROR]", "").strip()
                             if clean_detail.startswith("symbol:") or clean_detail.startswith("location:"):
                                 details.append(clean_detail)
-                        j += 1
 
                     if details:
                         full_error += "\n      " + "\n      ".join(details)
@@ -61,36 +86,98 @@ def analyze_maven_log(log_output, target_test_class):
                     if full_error not in seen_errors:
                         relevant_errors.append(full_error)
                         seen_errors.add(full_error)
+                else:
+                    unrelated_errors.add(file_name)
 
-                    i = j - 1
+        # --- 1b. Catch Compilation Errors (Gradle / plain javac format) ---
+        elif ".java:" in line and ": error:" in line:
+            match = re.search(r"[/\\]?(\w+\.java):(\d+):\s+error:\s+(.*)", line)
+            if match:
+                file_name = match.group(1)
+                line_num = match.group(2)
+                main_msg = match.group(3)
+
+                if file_name == f"{target_test_class}.java":
+                    full_error = f"Line {line_num}: {main_msg}"
+
+                    details = []
+                    for next_line in lines:
+                        if ".java:" in next_line or next_line.startswith(("> Task", "FAILURE:")):
+                            lines.push_back(next_line)
+                            break
+                        clean_detail = next_line.strip()
+                        if clean_detail.startswith("symbol:") or clean_detail.startswith("location:"):
+                            details.append(clean_detail)
+
+                    if details:
+                        full_error += "\n      " + "\n      ".join(details)
+
+                    if full_error not in seen_errors:
+                        relevant_errors.append(full_error)
+                        seen_errors.add(full_error)
                 else:
                     unrelated_errors.add(file_name)
 
         # --- 2. Catch Runtime Failures ---
-        elif "<<< FAILURE!" in line or "<<< ERROR!" in line:
+        elif "<<< FAILURE!" in line or "<<< ERROR!" in line or (" > " in line and line.rstrip().endswith(" FAILED")):
             clean_header = line.replace("[ERROR]", "").strip()
             if clean_header not in seen_errors:
                 relevant_errors.append(f"❌ {clean_header}")
                 seen_errors.add(clean_header)
 
-            j = i + 1
             stack_lines = 0
-            while j < len(lines) and stack_lines < 20:
-                next_line = lines[j]
-                if "[INFO] Running" in next_line or "[INFO] Results:" in next_line:
+            while stack_lines < 20:
+                next_line = next(lines, None)
+                if next_line is None:
+                    break
+                if "[INFO] Running" in next_line or "[INFO] Results:" in next_line or next_line.rstrip().endswith(" FAILED"):
+                    lines.push_back(next_line)
                     break
                 if "[INFO]" not in next_line:
                     clean_trace = next_line.replace("[ERROR]", "").strip()
                     relevant_errors.append(f"   {clean_trace}")
-                j += 1
                 stack_lines += 1
 
-            i = j - 1
-
-        i += 1
-
     return {
         "relevant_errors": "\n".join(relevant_errors),
         "unrelated_errors": list(unrelated_errors),
-        "is_success": "BUILD SUCCESS" in log_output
-    }
\ No newline at end of file
+        "is_success": lines.saw_success
+    }
+
+
+def parse_pit_report(report_path):
+    """
+    Reads PIT's mutations.xml and returns the mutants the tests failed to kill,
+    as dicts with 'method', 'line', 'mutator', 'description' and 'status'.
+    """
+    try:
+        root = ET.parse(report_path).getroot()
+    except (OSError, ET.ParseError):
+        return None
+
+    survivors = []
+    for mutation in root.iter("mutation"):
+        status = mutation.get("status", "")
+        if status not in ("SURVIVED", "NO_COVERAGE"):
+            continue
+        survivors.append({
+            "method": mutation.findtext("mutatedMethod", ""),
+            "line": mutation.findtext("lineNumber", ""),
+            "mutator": mutation.findtext("mutator", "").rsplit(".", 1)[-1],
+            "description": mutation.findtext("description", ""),
+            "status": status,
+        })
+    return survivors
+
+
+def peak_rss_mb():
+    """ Peak resident set size of this process in MB (None where unsupported) """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS, kilobytes on Linux
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024